@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used instead
+    orjson = None
+
+
+def encode_payload(payload: Any) -> bytes:
+    """
+    Encode a CLI payload once as indented JSON, using orjson when available.
+
+    orjson writes non-ASCII text as raw UTF-8 where json.dumps escapes it
+    (``"é"`` rather than ``"\\u00e9"``); both are the same JSON value.
+    Non-str dict keys are converted to strings as json.dumps does.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, indent=2).encode("utf-8")
@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-import argparse
 import csv
-import json
 import sys
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from backend.agents._json_output import encode_payload
     from backend.agents.temporal_evolution_agent import TemporalEvolutionAgent
 else:
+    from backend.agents._json_output import encode_payload
     from backend.agents.temporal_evolution_agent import TemporalEvolutionAgent
 
 
@@ -23,6 +24,12 @@ def _dt(raw: Any) -> datetime | None:
     text = _s(raw)
     if not text:
         return None
+    return _parse_dt_text(text)
+
+
+# Timeline and CSV timestamps repeat heavily; datetimes are immutable, so results are shared.
+@lru_cache(maxsize=1 << 16)
+def _parse_dt_text(text: str) -> datetime | None:
     try:
         parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
         if parsed.tzinfo is not None:
@@ -276,6 +283,8 @@ class ContextFusionAgent:
 
 
 def main() -> None:
+    import argparse
+
     parser = argparse.ArgumentParser(description="Enrich timeline events with clinical context and provenance.")
     parser.add_argument("--identifier", required=True, help="Patient UUID, patient_id, or MRN.")
     parser.add_argument("--data-root", default="data", help="Path to data directory.")
@@ -284,12 +293,15 @@ def main() -> None:
 
     agent = ContextFusionAgent(args.data_root)
     payload = agent.build(args.identifier)
-    print(json.dumps(payload, indent=2))
+    encoded = encode_payload(payload)
+    sys.stdout.buffer.write(encoded)
+    sys.stdout.buffer.write(b"\n")
+    sys.stdout.buffer.flush()
 
     if args.output:
         out = Path(args.output)
         out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        out.write_bytes(encoded)
 
 
 if __name__ == "__main__":
@@ -1,14 +1,25 @@
 from __future__ import annotations
 
-import argparse
+import copy
 import csv
 import json
 import re
+import sys
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from backend.agents._json_output import encode_payload
+else:
+    from backend.agents._json_output import encode_payload
+
+
+# Identifiers kept by resolve_one; the least recently used entry is dropped past this.
+_RESOLVE_ONE_CACHE_SIZE = 1024
 
 UUID_PATTERN = re.compile(
     r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
@@ -88,6 +99,31 @@ class IdentityAgent:
             "fhir_stu3": self.data_root / "fhir_stu3",
         }
         self.ccda_ns = {"c": "urn:hl7-org:v3"}
+        # identifier -> (source fingerprint, documents read, their mtimes, best match), LRU order
+        self._resolve_one_cache: OrderedDict[
+            str, tuple[tuple[int, ...], tuple[Path, ...], tuple[int, ...], ResolvedIdentity | None]
+        ] = OrderedDict()
+
+    @staticmethod
+    def _mtimes(paths: Any) -> tuple[int, ...]:
+        stamps: list[int] = []
+        for path in paths:
+            try:
+                stamps.append(path.stat().st_mtime_ns)
+            except FileNotFoundError:
+                stamps.append(-1)
+        return tuple(stamps)
+
+    def _sources_fingerprint(self) -> tuple[int, ...]:
+        """
+        mtime_ns of patients.csv, every patients-export-*.csv and each document folder.
+
+        Folder mtimes change when documents are added, removed or renamed; missing paths count as -1.
+        In-place edits of a document are caught by `resolve_one`, which also stamps the documents it read.
+        """
+        paths = [self.csv_dir / "patients.csv", *self.doc_dirs.values()]
+        paths.extend(sorted(self.data_root.glob("patients-export-*.csv")))
+        return self._mtimes(paths)
 
     def _load_csv_patients(self) -> dict[str, dict[str, str]]:
         patients_path = self.csv_dir / "patients.csv"
@@ -388,14 +424,41 @@ class IdentityAgent:
         return deduped
 
     def resolve_one(self, identifier: str) -> ResolvedIdentity | None:
+        """
+        Best match for `identifier`, cached per agent until patients.csv, an export, a
+        document folder or one of the C-CDA/FHIR documents read for the candidates changes.
+
+        Each call returns its own copy, so callers may mutate the result. At most
+        _RESOLVE_ONE_CACHE_SIZE identifiers are kept, least recently used first out.
+        """
+        fingerprint = self._sources_fingerprint()
+        cache = self._resolve_one_cache
+        cached = cache.get(identifier)
+        if cached is not None and cached[0] == fingerprint and cached[2] == self._mtimes(cached[1]):
+            cache.move_to_end(identifier)
+            return copy.deepcopy(cached[3])
         matches = self.resolve(identifier)
-        if not matches:
-            return None
-        matches.sort(key=lambda m: (-m.confidence, m.csv_patient_uuid))
-        return matches[0]
+        best = None
+        if matches:
+            matches.sort(key=lambda m: (-m.confidence, m.csv_patient_uuid))
+            best = matches[0]
+        # Every candidate's documents can affect confidence and so the ranking.
+        doc_paths = tuple(
+            Path(item["file_path"])
+            for match in matches
+            for item in match.evidence
+            if item.get("dataset_type") in self.doc_dirs
+        )
+        cache[identifier] = (fingerprint, doc_paths, self._mtimes(doc_paths), copy.deepcopy(best))
+        cache.move_to_end(identifier)
+        if len(cache) > _RESOLVE_ONE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return best
 
 
 def main() -> None:
+    import argparse
+
     parser = argparse.ArgumentParser(description="Resolve a patient identity across CSV, C-CDA and FHIR datasets.")
     parser.add_argument("--identifier", required=True, help="Patient UUID, patient_id, or medical_record_number.")
     parser.add_argument("--data-root", default="data", help="Path to data directory.")
@@ -406,12 +469,15 @@ def main() -> None:
     matches = agent.resolve(args.identifier)
 
     payload = [m.to_dict() for m in matches]
-    print(json.dumps(payload, indent=2))
+    encoded = encode_payload(payload)
+    sys.stdout.buffer.write(encoded)
+    sys.stdout.buffer.write(b"\n")
+    sys.stdout.buffer.flush()
 
     if args.output:
         out_path = Path(args.output)
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        out_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        out_path.write_bytes(encoded)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import argparse
 import json
 import os
 import sys
@@ -8,14 +7,17 @@ import urllib.error
 import urllib.request
 from collections import defaultdict
 from datetime import date, datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from backend.agents._json_output import encode_payload
     from backend.agents.context_fusion_agent import ContextFusionAgent
     from backend.agents.profile_builder_agent import ProfileBuilderAgent
 else:
+    from backend.agents._json_output import encode_payload
     from backend.agents.context_fusion_agent import ContextFusionAgent
     from backend.agents.profile_builder_agent import ProfileBuilderAgent
 
@@ -28,6 +30,12 @@ def _dt(raw: Any) -> datetime | None:
     t = _s(raw)
     if not t:
         return None
+    return _parse_dt_text(t)
+
+
+# Timeline and CSV timestamps repeat heavily; datetimes are immutable, so results are shared.
+@lru_cache(maxsize=1 << 16)
+def _parse_dt_text(t: str) -> datetime | None:
     try:
         parsed = datetime.fromisoformat(t.replace("Z", "+00:00"))
         if parsed.tzinfo is not None:
@@ -408,6 +416,8 @@ class NarrativeAgent:
 
 
 def main() -> None:
+    import argparse
+
     parser = argparse.ArgumentParser(description="Generate clinician-readable summaries from fused clinical timeline.")
     parser.add_argument("--identifier", required=True, help="Patient UUID, patient_id, or MRN.")
     parser.add_argument("--data-root", default="data", help="Path to data directory.")
@@ -454,12 +464,16 @@ def main() -> None:
             f"model={payload.get('generation_model')}"
         )
 
-    print(json.dumps(payload, indent=2))
+    encoded = encode_payload(payload)
+    sys.stdout.flush()  # keep the --proof line ahead of the payload
+    sys.stdout.buffer.write(encoded)
+    sys.stdout.buffer.write(b"\n")
+    sys.stdout.buffer.flush()
 
     if args.output:
         out = Path(args.output)
         out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        out.write_bytes(encoded)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import argparse
 import json
 import sys
 from datetime import datetime
@@ -9,10 +8,12 @@ from typing import Any
 
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from backend.agents._json_output import encode_payload
     from backend.agents.context_fusion_agent import ContextFusionAgent
     from backend.agents.narrative_agent import NarrativeAgent
     from backend.agents.profile_builder_agent import ProfileBuilderAgent
 else:
+    from backend.agents._json_output import encode_payload
     from backend.agents.context_fusion_agent import ContextFusionAgent
     from backend.agents.narrative_agent import NarrativeAgent
     from backend.agents.profile_builder_agent import ProfileBuilderAgent
@@ -129,11 +130,13 @@ class PatientEvolutionOrchestrator:
         output_dir.mkdir(parents=True, exist_ok=True)
         out = Path(output_path) if output_path else output_dir / f"{identifier}_patient_evolution.json"
         out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        out.write_bytes(encode_payload(payload))
         return out
 
 
 def main() -> None:
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Build and save full PatientEvolution package in one run."
     )
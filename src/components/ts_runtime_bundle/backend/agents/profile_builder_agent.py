@@ -1,19 +1,22 @@
 from __future__ import annotations
 
-import argparse
 import csv
 import json
+import operator
+import os
 import sys
 import xml.etree.ElementTree as ET
 from collections import Counter
-from dataclasses import asdict
+from dataclasses import asdict, fields
 from datetime import date, datetime
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from backend.agents._json_output import encode_payload
     from backend.agents.identity_agent import IdentityAgent
     from backend.models import (
         Allergy,
@@ -30,6 +33,7 @@ if __package__ is None or __package__ == "":
         VitalSigns,
     )
 else:
+    from backend.agents._json_output import encode_payload
     from backend.agents.identity_agent import IdentityAgent
     from backend.models import (
         Allergy,
@@ -46,6 +50,16 @@ else:
         VitalSigns,
     )
 
+_SAFE_TYPES = frozenset({str, int, float, bool, type(None)})
+_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S", "%Y%m%d", "%Y%m%d%H%M%S")
+_DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S", "%Y%m%d%H%M%S")
+_ASCII_DIGITS = "0123456789"
+_ISO_SEPARATORS = {4: "-", 7: "-", 10: "T", 13: ":", 16: ":"}
+
+# VitalSigns is flat, so a field-tuple getter replaces the recursive asdict() walk.
+_VITAL_FIELDS = tuple(f.name for f in fields(VitalSigns))
+_vital_values = operator.attrgetter(*_VITAL_FIELDS)
+
 
 def _safe_float(value: Any) -> float | None:
     raw = str(value).strip() if value is not None else ""
@@ -68,7 +82,7 @@ def _parse_date(raw: Any) -> date | None:
     text = str(raw).strip() if raw is not None else ""
     if not text:
         return None
-    for fmt in ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S", "%Y%m%d", "%Y%m%d%H%M%S"):
+    for fmt in _DATE_FORMATS:
         try:
             return datetime.strptime(text, fmt).date()
         except ValueError:
@@ -85,7 +99,44 @@ def _parse_datetime(raw: Any) -> datetime | None:
     text = str(raw).strip() if raw is not None else ""
     if not text:
         return None
-    for fmt in ("%Y-%m-%d %H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S", "%Y%m%d%H%M%S"):
+    return _parse_datetime_text(text)
+
+
+def _is_plain_iso_datetime(text: str) -> bool:
+    # "YYYY-MM-DDTHH:MM:SS" in ASCII digits, then nothing, "Z", "+HHMM" or "+HH:MM".
+    n = len(text)
+    if n < 19:
+        return False
+    for i, c in enumerate(text[:19]):
+        if c not in _ISO_SEPARATORS.get(i, _ASCII_DIGITS):
+            return False
+    if n == 19:
+        return True
+    if n == 20:
+        return text[19] == "Z"
+    if text[19] not in "+-":
+        return False
+    if n == 24:
+        offset = text[20:]
+    elif n == 25 and text[22] == ":":
+        offset = text[20:22] + text[23:]
+    else:
+        return False
+    # strptime's %z only takes offset minutes 00-59.
+    return all(c in _ASCII_DIGITS for c in offset) and offset[2] in "012345"
+
+
+@lru_cache(maxsize=4096)
+def _parse_datetime_text(text: str) -> datetime | None:
+    # CSV and export timestamps repeat heavily, so parsed values are memoized.
+    # Fast path only for the ISO shapes the "T" formats below accept; anything
+    # fromisoformat rejects still goes through strptime.
+    if _is_plain_iso_datetime(text):
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            pass
+    for fmt in _DATETIME_FORMATS:
         try:
             return datetime.strptime(text, fmt)
         except ValueError:
@@ -112,6 +163,9 @@ def _enum_allergy_status(value: Any) -> AllergyStatus:
 
 
 def _as_jsonable(value: Any) -> Any:
+    # Exact-type check: most leaves are already JSON-safe scalars.
+    if type(value) in _SAFE_TYPES:
+        return value
     if isinstance(value, Enum):
         return value.value
     if isinstance(value, (datetime, date)):
@@ -123,6 +177,19 @@ def _as_jsonable(value: Any) -> Any:
     return value
 
 
+def _vital_signs_jsonable(vital_signs: list[VitalSigns]) -> list[dict[str, Any]]:
+    # Every VitalSigns field is a number or None except measurement_date, so
+    # only that column needs converting; the generic _as_jsonable walk is skipped.
+    out: list[dict[str, Any]] = []
+    for values in map(_vital_values, vital_signs):
+        row = dict(zip(_VITAL_FIELDS, values))
+        measured = row["measurement_date"]
+        if measured is not None:
+            row["measurement_date"] = measured.isoformat()
+        out.append(row)
+    return out
+
+
 def _hl7_to_date(raw: str | None) -> date | None:
     if not raw:
         return None
@@ -151,6 +218,10 @@ class ProfileBuilderAgent:
         }
         self.ccda_ns = {"c": "urn:hl7-org:v3"}
         self.identity_agent = IdentityAgent(self.data_root)
+        self._csv_index: dict[tuple[str, str], tuple[tuple[int, int], dict[str, list[dict[str, str]]]]] = {}
+        self._doc_paths_cache: dict[Path, tuple[int, list[str]]] = {}
+        # Insurance is a frozen value type; a cohort shares few payer/plan pairs.
+        self._insurance_pool: dict[Insurance, Insurance] = {}
 
     def _load_csv_rows(self, filename: str) -> list[dict[str, str]]:
         path = self.csv_dir / filename
@@ -159,6 +230,25 @@ class ProfileBuilderAgent:
         with path.open(newline="", encoding="utf-8") as handle:
             return list(csv.DictReader(handle))
 
+    def _build_index(self, filename: str, key: str = "PATIENT") -> dict[str, list[dict[str, str]]]:
+        """Group rows of a CSV by the lowercased `key` column, rebuilt only when the file changes."""
+        try:
+            stat = (self.csv_dir / filename).stat()
+        except FileNotFoundError:
+            return {}
+        fingerprint = (stat.st_mtime_ns, stat.st_size)
+        cached = self._csv_index.get((filename, key))
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        index: dict[str, list[dict[str, str]]] = {}
+        for row in self._load_csv_rows(filename):
+            index.setdefault(str(row.get(key, "")).strip().lower(), []).append(row)
+        self._csv_index[(filename, key)] = (fingerprint, index)
+        return index
+
+    def _patient_rows(self, filename: str, csv_uuid: str | None) -> list[dict[str, str]]:
+        return self._build_index(filename).get(str(csv_uuid or "").lower(), [])
+
     def _profile_export_payload(self, identifier: str) -> tuple[dict[str, Any] | None, str | None]:
         candidates = sorted(self.data_root.glob("patients-export-*.csv"), key=lambda p: p.stat().st_mtime)
         if not candidates:
@@ -181,12 +271,34 @@ class ProfileBuilderAgent:
                     return (payload, row.get("created_at"))
         return (None, None)
 
+    def _doc_names(self, folder: Path) -> list[str]:
+        """
+        Sorted entry names in `folder`, re-listed only when the directory changes.
+
+        Membership matches the old folder.glob: no suffix or file-type filter here,
+        the FHIR/C-CDA parsers skip paths with the wrong suffix themselves.
+        """
+        try:
+            mtime_ns = folder.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        cached = self._doc_paths_cache.get(folder)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        try:
+            with os.scandir(folder) as entries:
+                names = sorted(entry.name for entry in entries)
+        except NotADirectoryError:
+            names = []
+        self._doc_paths_cache[folder] = (mtime_ns, names)
+        return names
+
     def _matching_doc_paths(self, csv_patient_uuid: str | None) -> list[Path]:
         if not csv_patient_uuid:
             return []
         paths: list[Path] = []
         for folder in self.doc_dirs.values():
-            paths.extend(sorted(folder.glob(f"*{csv_patient_uuid}*")))
+            paths.extend(folder / name for name in self._doc_names(folder) if csv_patient_uuid in name)
         return paths
 
     def _obs_to_vital_field(self, description: str) -> str | None:
@@ -298,62 +410,84 @@ class ProfileBuilderAgent:
                 )
         return (labs, [vitals_by_day[k] for k in sorted(vitals_by_day.keys())])
 
+    def _ccda_section_observations(self, section: ET.Element) -> list[tuple[str, str, str, date | None]]:
+        title_node = section.find("c:title", self.ccda_ns)
+        title = (title_node.text or "").strip().lower() if title_node is not None and title_node.text else ""
+        if "result" not in title and "vital" not in title:
+            return []
+        out: list[tuple[str, str, str, date | None]] = []
+        for obs in section.findall(".//c:observation", self.ccda_ns):
+            code_node = obs.find("c:code", self.ccda_ns)
+            display = code_node.attrib.get("displayName") if code_node is not None else None
+            value_node = obs.find("c:value", self.ccda_ns)
+            if value_node is None:
+                continue
+            effective_node = obs.find("c:effectiveTime", self.ccda_ns)
+            out.append(
+                (
+                    (display or "Observation").strip(),
+                    str(value_node.attrib.get("value") or "").strip(),
+                    str(value_node.attrib.get("unit") or "").strip(),
+                    _hl7_to_date(effective_node.attrib.get("value") if effective_node is not None else None),
+                )
+            )
+        return out
+
     def _build_labs_and_vitals_from_ccda(self, paths: list[Path]) -> tuple[list[LabResult], list[VitalSigns]]:
         labs: list[LabResult] = []
         vitals_by_day: dict[str, VitalSigns] = {}
+        section_tag = f"{{{self.ccda_ns['c']}}}section"
         for path in paths:
             if not path.suffix.lower().endswith("xml"):
                 continue
+            # Stream the document and release each top-level section once it has
+            # been read, so peak memory is bounded by a section rather than the file.
+            points: list[tuple[str, str, str, date | None]] = []
+            depth = 0
             try:
-                root = ET.parse(path).getroot()
+                for event, elem in ET.iterparse(path, events=("start", "end")):
+                    if elem.tag != section_tag:
+                        continue
+                    if event == "start":
+                        depth += 1
+                        continue
+                    depth -= 1
+                    if depth:
+                        continue
+                    for section in elem.iter(section_tag):
+                        points.extend(self._ccda_section_observations(section))
+                    elem.clear()
             except ET.ParseError:
                 continue
 
-            sections = root.findall(".//c:section", self.ccda_ns)
-            for section in sections:
-                title_node = section.find("c:title", self.ccda_ns)
-                title = (title_node.text or "").strip().lower() if title_node is not None and title_node.text else ""
-                if "result" not in title and "vital" not in title:
+            for test_name, value, unit, date_performed in points:
+                vital_field = self._obs_to_vital_field(test_name)
+                if vital_field:
+                    day_key = date_performed.isoformat() if date_performed else "unknown"
+                    vital = vitals_by_day.get(day_key)
+                    if vital is None:
+                        vital = VitalSigns(
+                            measurement_date=datetime.combine(date_performed, datetime.min.time())
+                            if date_performed
+                            else None
+                        )
+                        vitals_by_day[day_key] = vital
+                    if vital_field in {"blood_pressure_systolic", "blood_pressure_diastolic", "heart_rate"}:
+                        setattr(vital, vital_field, _safe_int(value))
+                    else:
+                        setattr(vital, vital_field, _safe_float(value))
                     continue
-                for obs in section.findall(".//c:observation", self.ccda_ns):
-                    code_node = obs.find("c:code", self.ccda_ns)
-                    display = code_node.attrib.get("displayName") if code_node is not None else None
-                    value_node = obs.find("c:value", self.ccda_ns)
-                    if value_node is None:
-                        continue
-                    test_name = (display or "Observation").strip()
-                    value = str(value_node.attrib.get("value") or "").strip()
-                    unit = str(value_node.attrib.get("unit") or "").strip()
-                    effective_node = obs.find("c:effectiveTime", self.ccda_ns)
-                    date_performed = _hl7_to_date(effective_node.attrib.get("value") if effective_node is not None else None)
-
-                    vital_field = self._obs_to_vital_field(test_name)
-                    if vital_field:
-                        day_key = date_performed.isoformat() if date_performed else "unknown"
-                        vital = vitals_by_day.get(day_key)
-                        if vital is None:
-                            vital = VitalSigns(
-                                measurement_date=datetime.combine(date_performed, datetime.min.time())
-                                if date_performed
-                                else None
-                            )
-                            vitals_by_day[day_key] = vital
-                        if vital_field in {"blood_pressure_systolic", "blood_pressure_diastolic", "heart_rate"}:
-                            setattr(vital, vital_field, _safe_int(value))
-                        else:
-                            setattr(vital, vital_field, _safe_float(value))
-                        continue
 
-                    labs.append(
-                        LabResult(
-                            test_name=test_name,
-                            result=value,
-                            unit=unit,
-                            reference_range="",
-                            flagged=False,
-                            date_performed=date_performed,
-                        )
+                labs.append(
+                    LabResult(
+                        test_name=test_name,
+                        result=value,
+                        unit=unit,
+                        reference_range="",
+                        flagged=False,
+                        date_performed=date_performed,
                     )
+                )
         return (labs, [vitals_by_day[k] for k in sorted(vitals_by_day.keys())])
 
     def _build_imaging_from_csv(self, rows: list[dict[str, str]]) -> list[ImagingStudy]:
@@ -423,6 +557,9 @@ class ProfileBuilderAgent:
     def build(self, identifier: str) -> dict[str, Any]:
         resolved = self.identity_agent.resolve_one(identifier)
         export_payload, export_created_at = self._profile_export_payload(identifier)
+        export = export_payload or {}
+        export_contact = export.get("contact_info", {})
+        export_insurance = export.get("insurance", {})
 
         csv_uuid = resolved.csv_patient_uuid if resolved else None
         stable_patient_id = (resolved.stable_patient_id if resolved else None) or (
@@ -432,8 +569,8 @@ class ProfileBuilderAgent:
             str(export_payload.get("medical_record_number")) if export_payload else None
         )
 
-        patients_rows = self._load_csv_rows("patients.csv")
-        patient_row = next((r for r in patients_rows if str(r.get("Id", "")).strip().lower() == str(csv_uuid or "").lower()), None)
+        patient_matches = self._build_index("patients.csv", key="Id").get(str(csv_uuid or "").lower())
+        patient_row = patient_matches[0] if patient_matches else None
 
         first_name = (
             (patient_row or {}).get("FIRST")
@@ -459,9 +596,9 @@ class ProfileBuilderAgent:
         )
 
         contact = ContactInfo(
-            phone=str((export_payload or {}).get("contact_info", {}).get("phone") or ""),
+            phone=str(export_contact.get("phone") or ""),
             address=(
-                str((export_payload or {}).get("contact_info", {}).get("address") or "").strip()
+                str(export_contact.get("address") or "").strip()
                 or (
                     " ".join(
                         [
@@ -473,16 +610,16 @@ class ProfileBuilderAgent:
                     ).strip()
                 )
             ),
-            emergency_contact_name=str((export_payload or {}).get("contact_info", {}).get("emergency_contact_name") or ""),
-            emergency_contact_relation=str((export_payload or {}).get("contact_info", {}).get("emergency_contact_relation") or ""),
-            emergency_contact_phone=str((export_payload or {}).get("contact_info", {}).get("emergency_contact_phone") or "") or None,
+            emergency_contact_name=str(export_contact.get("emergency_contact_name") or ""),
+            emergency_contact_relation=str(export_contact.get("emergency_contact_relation") or ""),
+            emergency_contact_phone=str(export_contact.get("emergency_contact_phone") or "") or None,
         )
 
-        encounters = [r for r in self._load_csv_rows("encounters.csv") if str(r.get("PATIENT", "")).strip().lower() == str(csv_uuid or "").lower()]
+        encounters = self._patient_rows("encounters.csv", csv_uuid)
         providers = {r["Id"]: r for r in self._load_csv_rows("providers.csv") if r.get("Id")}
         organizations = {r["Id"]: r for r in self._load_csv_rows("organizations.csv") if r.get("Id")}
         payers = {r["Id"]: r for r in self._load_csv_rows("payers.csv") if r.get("Id")}
-        transitions = [r for r in self._load_csv_rows("payer_transitions.csv") if str(r.get("PATIENT", "")).strip().lower() == str(csv_uuid or "").lower()]
+        transitions = self._patient_rows("payer_transitions.csv", csv_uuid)
 
         provider_counter = Counter([str(r.get("PROVIDER") or "") for r in encounters if str(r.get("PROVIDER") or "").strip()])
         org_counter = Counter([str(r.get("ORGANIZATION") or "") for r in encounters if str(r.get("ORGANIZATION") or "").strip()])
@@ -496,22 +633,23 @@ class ProfileBuilderAgent:
 
         insurance = Insurance(
             provider=(
-                str((export_payload or {}).get("insurance", {}).get("provider") or "").strip()
+                str(export_insurance.get("provider") or "").strip()
                 or str((payers.get(top_payer_id) or {}).get("NAME") or "").strip()
                 or "Unknown"
             ),
             plan_type=(
-                str((export_payload or {}).get("insurance", {}).get("plan_type") or "").strip()
+                str(export_insurance.get("plan_type") or "").strip()
                 or str((top_transition or {}).get("OWNERSHIP") or "").strip()
                 or "Unknown"
             ),
         )
+        insurance = self._insurance_pool.setdefault(insurance, insurance)
 
-        allergies_rows = [r for r in self._load_csv_rows("allergies.csv") if str(r.get("PATIENT", "")).strip().lower() == str(csv_uuid or "").lower()]
-        medications_rows = [r for r in self._load_csv_rows("medications.csv") if str(r.get("PATIENT", "")).strip().lower() == str(csv_uuid or "").lower()]
-        conditions_rows = [r for r in self._load_csv_rows("conditions.csv") if str(r.get("PATIENT", "")).strip().lower() == str(csv_uuid or "").lower()]
-        observations_rows = [r for r in self._load_csv_rows("observations.csv") if str(r.get("PATIENT", "")).strip().lower() == str(csv_uuid or "").lower()]
-        imaging_rows = [r for r in self._load_csv_rows("imaging_studies.csv") if str(r.get("PATIENT", "")).strip().lower() == str(csv_uuid or "").lower()]
+        allergies_rows = self._patient_rows("allergies.csv", csv_uuid)
+        medications_rows = self._patient_rows("medications.csv", csv_uuid)
+        conditions_rows = self._patient_rows("conditions.csv", csv_uuid)
+        observations_rows = self._patient_rows("observations.csv", csv_uuid)
+        imaging_rows = self._patient_rows("imaging_studies.csv", csv_uuid)
 
         allergies = [
             Allergy(
@@ -646,25 +784,25 @@ class ProfileBuilderAgent:
             imaging_studies=imaging_studies,
             diagnostic_tests=diagnostic_tests,
             primary_care_physician=(
-                str((export_payload or {}).get("primary_care_physician") or "").strip()
+                str(export.get("primary_care_physician") or "").strip()
                 or str((providers.get(top_provider_id) or {}).get("NAME") or "").strip()
                 or None
             ),
             hospital=(
-                str((export_payload or {}).get("hospital") or "").strip()
+                str(export.get("hospital") or "").strip()
                 or str((organizations.get(top_org_id) or {}).get("NAME") or "").strip()
                 or None
             ),
-            admission_date=_parse_date((export_payload or {}).get("admission_date")),
-            patient_signature=(export_payload or {}).get("patient_signature") if export_payload else None,
-            signature_date=_parse_datetime((export_payload or {}).get("signature_date")) if export_payload else None,
+            admission_date=_parse_date(export.get("admission_date")),
+            patient_signature=export.get("patient_signature"),
+            signature_date=_parse_datetime(export.get("signature_date")),
         )
 
         payload = {
             "identity": resolved.to_dict() if resolved else None,
             "export_profile_created_at": export_created_at,
             "patient": _as_jsonable(asdict(patient)),
-            "vital_signs": _as_jsonable([asdict(v) for v in vital_signs]),
+            "vital_signs": _vital_signs_jsonable(vital_signs),
             "source_counts": {
                 "encounters": len(encounters),
                 "allergies_csv": len(allergies_rows),
@@ -682,6 +820,8 @@ class ProfileBuilderAgent:
 
 
 def main() -> None:
+    import argparse
+
     parser = argparse.ArgumentParser(description="Build patient profile from CSV + FHIR + C-CDA.")
     parser.add_argument("--identifier", required=True, help="Patient UUID, patient_id, or MRN.")
     parser.add_argument("--data-root", default="data", help="Path to data directory.")
@@ -690,12 +830,15 @@ def main() -> None:
 
     agent = ProfileBuilderAgent(args.data_root)
     profile = agent.build(args.identifier)
-    print(json.dumps(profile, indent=2))
+    encoded = encode_payload(profile)
+    sys.stdout.buffer.write(encoded)
+    sys.stdout.buffer.write(b"\n")
+    sys.stdout.buffer.flush()
 
     if args.output:
         out = Path(args.output)
         out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_text(json.dumps(profile, indent=2), encoding="utf-8")
+        out.write_bytes(encoded)
 
 
 if __name__ == "__main__":
@@ -1,22 +1,35 @@
 from __future__ import annotations
 
-import argparse
 import csv
 import json
+import os
+import re
 import sys
 import xml.etree.ElementTree as ET
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping
 
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from backend.agents._json_output import encode_payload, orjson
     from backend.agents.identity_agent import IdentityAgent
 else:
+    from backend.agents._json_output import encode_payload, orjson
     from backend.agents.identity_agent import IdentityAgent
 
 
+# Both accept bytes, so bundles are read without a separate UTF-8 decode step.
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
 def _safe_str(value: Any) -> str:
     return str(value).strip() if value is not None else ""
 
@@ -25,7 +38,12 @@ def _parse_any_datetime(raw: Any) -> str | None:
     text = _safe_str(raw)
     if not text:
         return None
+    return _normalize_datetime_text(text)
+
 
+@lru_cache(maxsize=1 << 16)
+def _normalize_datetime_text(text: str) -> str | None:
+    # Called per CSV cell, C-CDA time node and FHIR field; the same stamps repeat a lot.
     # Direct ISO support, including trailing Z.
     if "T" in text or "-" in text:
         try:
@@ -40,9 +58,16 @@ def _parse_any_datetime(raw: Any) -> str | None:
         core = text[:14]
         suffix = text[14:]
     if core.isdigit() and len(core) in {8, 12, 14}:
-        fmt = {8: "%Y%m%d", 12: "%Y%m%d%H%M", 14: "%Y%m%d%H%M%S"}[len(core)]
+        # Fixed-width digits: slice the fields directly instead of going through strptime.
         try:
-            parsed = datetime.strptime(core, fmt).isoformat(timespec="seconds")
+            parsed = datetime(
+                int(core[0:4]),
+                int(core[4:6]),
+                int(core[6:8]),
+                int(core[8:10] or 0),
+                int(core[10:12] or 0),
+                int(core[12:14] or 0),
+            ).isoformat(timespec="seconds")
             return f"{parsed}{suffix}" if suffix else parsed
         except ValueError:
             pass
@@ -57,6 +82,16 @@ def _parse_any_datetime(raw: Any) -> str | None:
     return None
 
 
+def _to_float(value: Any) -> float | None:
+    # Lab values are mostly missing or numeric; skip None without raising.
+    if value is None:
+        return None
+    try:
+        return float(str(value))
+    except ValueError:
+        return None
+
+
 def _extract_uuid_from_filename(path: Path) -> str | None:
     parts = path.stem.split("_")
     if not parts:
@@ -67,6 +102,220 @@ def _extract_uuid_from_filename(path: Path) -> str | None:
     return None
 
 
+_CCDA_NS = {"c": "urn:hl7-org:v3"}
+_CCDA_TIME_TAGS = frozenset({"effectiveTime", "low", "high", "time"})
+_CCDA_CONTEXT_TAGS = frozenset({"encounter", "observation", "procedure", "substanceAdministration", "act", "organizer"})
+
+# Shared read-only fallback for absent FHIR sub-objects.
+_EMPTY_DICT: Mapping[str, Any] = MappingProxyType({})
+
+# FHIR resourceType -> (timeline category, subtype); anything else is a plain context time.
+_FHIR_TYPE_MAP = {
+    "Condition": ("diagnosis_onset", "condition_event"),
+    "MedicationRequest": ("treatment_change", "medication_event"),
+    "MedicationStatement": ("treatment_change", "medication_event"),
+    "MedicationAdministration": ("treatment_change", "medication_event"),
+    "Procedure": ("treatment_change", "procedure_event"),
+    "CarePlan": ("treatment_change", "careplan_event"),
+    "ServiceRequest": ("treatment_change", "servicerequest_event"),
+    "Encounter": ("admission_discharge", "encounter_cycle"),
+    "Observation": ("lab_trend", "observation"),
+}
+
+
+def _local_tag(node: ET.Element) -> str:
+    return node.tag.split("}", 1)[-1]
+
+
+def _nearest_clinical_context(ancestors: list[ET.Element]) -> ET.Element | None:
+    for cur in reversed(ancestors):
+        if _local_tag(cur) in _CCDA_CONTEXT_TAGS:
+            return cur
+    return None
+
+
+_FhirTimes = list[tuple[str, str | None, str | None]]
+
+
+def _fhir_times(resource: dict[str, Any]) -> _FhirTimes:
+    out: _FhirTimes = []
+    # Requested fields.
+    if resource.get("effectiveDateTime"):
+        out.append(("effectiveDateTime", _parse_any_datetime(resource.get("effectiveDateTime")), None))
+    if resource.get("issued"):
+        out.append(("issued", _parse_any_datetime(resource.get("issued")), None))
+    if resource.get("recordedDate"):
+        out.append(("recordedDate", _parse_any_datetime(resource.get("recordedDate")), None))
+    if resource.get("onsetDateTime"):
+        out.append(("onsetDateTime", _parse_any_datetime(resource.get("onsetDateTime")), None))
+    if isinstance(resource.get("onsetPeriod"), dict):
+        onset = resource["onsetPeriod"]
+        out.append(("onsetPeriod", _parse_any_datetime(onset.get("start")), _parse_any_datetime(onset.get("end"))))
+    if isinstance(resource.get("period"), dict):
+        period = resource["period"]
+        out.append(("period", _parse_any_datetime(period.get("start")), _parse_any_datetime(period.get("end"))))
+    return [x for x in out if x[1] or x[2]]
+
+
+# The specialized extractors check the same fields in the same order as _fhir_times,
+# limited to the ones the resource type defines.
+def _fhir_times_effective(resource: dict[str, Any]) -> _FhirTimes:
+    out: _FhirTimes = []
+    if resource.get("effectiveDateTime"):
+        out.append(("effectiveDateTime", _parse_any_datetime(resource.get("effectiveDateTime")), None))
+    if resource.get("issued"):
+        out.append(("issued", _parse_any_datetime(resource.get("issued")), None))
+    return [x for x in out if x[1]]
+
+
+def _fhir_times_condition(resource: dict[str, Any]) -> _FhirTimes:
+    out: _FhirTimes = []
+    if resource.get("recordedDate"):
+        out.append(("recordedDate", _parse_any_datetime(resource.get("recordedDate")), None))
+    if resource.get("onsetDateTime"):
+        out.append(("onsetDateTime", _parse_any_datetime(resource.get("onsetDateTime")), None))
+    if isinstance(resource.get("onsetPeriod"), dict):
+        onset = resource["onsetPeriod"]
+        out.append(("onsetPeriod", _parse_any_datetime(onset.get("start")), _parse_any_datetime(onset.get("end"))))
+    return [x for x in out if x[1] or x[2]]
+
+
+def _fhir_times_period(resource: dict[str, Any]) -> _FhirTimes:
+    period = resource.get("period")
+    if not isinstance(period, dict):
+        return []
+    start = _parse_any_datetime(period.get("start"))
+    end = _parse_any_datetime(period.get("end"))
+    return [("period", start, end)] if start or end else []
+
+
+_TIME_EXTRACTORS: dict[str, Callable[[dict[str, Any]], _FhirTimes]] = {
+    "Observation": _fhir_times_effective,
+    "DiagnosticReport": _fhir_times_effective,
+    "Condition": _fhir_times_condition,
+    "Encounter": _fhir_times_period,
+    "CarePlan": _fhir_times_period,
+    "CareTeam": _fhir_times_period,
+}
+
+
+@lru_cache(maxsize=256)
+def _ccda_time_points(
+    path_str: str, mtime_ns: int
+) -> tuple[tuple[str, str, str, str | None, str | None, str | None, str | None], ...]:
+    """
+    Extract every parseable time point of a C-CDA document as
+    (time_tag, raw_time, time_value, context_tag, code, display, section_title).
+
+    Cached on (path, mtime_ns): repeat patients in one session skip the XML parse,
+    and a modified file gets a new key.
+    """
+    try:
+        root = ET.parse(path_str).getroot()
+    except ET.ParseError:
+        return ()
+
+    points: list[tuple[str, str, str, str | None, str | None, str | None, str | None]] = []
+    # Depth-first walk in document order that carries the ancestor chain and, per
+    # depth, the title of the nearest enclosing section (computed once per section).
+    # The chain includes the node itself, which is harmless: time tags are never
+    # section/context tags.
+    ancestors: list[ET.Element] = []
+    section_titles: list[str | None] = []
+    stack: list[tuple[ET.Element, int]] = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        del ancestors[depth:]
+        del section_titles[depth:]
+        tag = _local_tag(node)
+        if tag == "section":
+            title = node.find("c:title", _CCDA_NS)
+            section_titles.append(title.text.strip() if title is not None and title.text and title.text.strip() else None)
+        else:
+            section_titles.append(section_titles[-1] if section_titles else None)
+        ancestors.append(node)
+        stack.extend((child, depth + 1) for child in reversed(node))
+        if tag not in _CCDA_TIME_TAGS:
+            continue
+        raw_time = node.attrib.get("value")
+        if not raw_time and node.text:
+            raw_time = node.text
+        time_value = _parse_any_datetime(raw_time)
+        if not time_value:
+            continue
+
+        ctx = _nearest_clinical_context(ancestors)
+        ctx_tag = _local_tag(ctx) if ctx is not None else None
+        code = None
+        display = None
+        if ctx is not None:
+            code_node = ctx.find("c:code", _CCDA_NS)
+            if code_node is not None:
+                code = _safe_str(code_node.attrib.get("code")) or None
+                display = _safe_str(code_node.attrib.get("displayName")) or None
+        points.append((tag, raw_time, time_value, ctx_tag, code, display, section_titles[-1]))
+    return tuple(points)
+
+
+@dataclass(slots=True)
+class TemporalEvent:
+    event_id: str
+    category: str
+    subtype: str
+    time_start: str | None
+    time_end: str | None
+    description: str | None
+    code: str | None
+    value: str | None
+    unit: str | None
+    flagged_abnormal: bool
+    source_dataset: str
+    source_file: str
+    context: dict[str, Any]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "event_id": self.event_id,
+            "category": self.category,
+            "subtype": self.subtype,
+            "time_start": self.time_start,
+            "time_end": self.time_end,
+            "description": self.description,
+            "code": self.code,
+            "value": self.value,
+            "unit": self.unit,
+            "flagged_abnormal": self.flagged_abnormal,
+            "source_dataset": self.source_dataset,
+            "source_file": self.source_file,
+            "context": self.context,
+        }
+
+
+_CSV_FILES = (
+    "encounters.csv",
+    "conditions.csv",
+    "medications.csv",
+    "observations.csv",
+    "procedures.csv",
+    "careplans.csv",
+    "immunizations.csv",
+)
+
+# Subtype fragments that make a treatment_change event an episode.
+_TC_RE = re.compile(r"(?:start|stop|change|restart|procedure|careplan)").search
+
+# Episode group -> its source_counts key, in output order.
+_EPISODE_COUNT_KEYS = (
+    ("diagnosis_onset", "diagnosis_onset_episodes"),
+    ("treatment_change", "treatment_change_episodes"),
+    ("abnormal_lab_trend", "abnormal_lab_trend_episodes"),
+    ("admission_discharge_cycles", "admission_discharge_cycle_episodes"),
+)
+
+# Timeline order; events without time_start are dropped before sorting and ids are always set.
+_timeline_key = attrgetter("time_start", "event_id")
+
+
 class TemporalEvolutionAgent:
     """
     Builds chronological patient evolution from CSV, C-CDA and FHIR sources.
@@ -86,9 +335,11 @@ class TemporalEvolutionAgent:
             "fhir_dstu2": self.data_root / "fhir_dstu2",
             "fhir_stu3": self.data_root / "fhir_stu3",
         }
-        self.ccda_ns = {"c": "urn:hl7-org:v3"}
         self.identity_agent = IdentityAgent(self.data_root)
         self._event_idx = 0
+        self._csv_cache: dict[str, tuple[tuple[int, int], list[str], dict[str, list[list[str]]]]] = {}
+        self._doc_listing_cache: tuple[tuple[int, ...], list[tuple[str, Path, list[str]]]] | None = None
+        self._export_cache: tuple[Path, int, dict[str, dict[str, Any]]] | None = None
 
     def _next_event_id(self) -> str:
         self._event_idx += 1
@@ -109,59 +360,120 @@ class TemporalEvolutionAgent:
         unit: str | None = None,
         flagged_abnormal: bool = False,
         context: dict[str, Any] | None = None,
-    ) -> dict[str, Any]:
-        return {
-            "event_id": self._next_event_id(),
-            "category": category,
-            "subtype": subtype,
-            "time_start": time_start,
-            "time_end": time_end,
-            "description": description,
-            "code": code,
-            "value": value,
-            "unit": unit,
-            "flagged_abnormal": flagged_abnormal,
-            "source_dataset": source_dataset,
-            "source_file": source_file,
-            "context": context or {},
-        }
+    ) -> TemporalEvent:
+        return TemporalEvent(
+            event_id=self._next_event_id(),
+            category=category,
+            subtype=subtype,
+            time_start=time_start,
+            time_end=time_end,
+            description=description,
+            code=code,
+            value=value,
+            unit=unit,
+            flagged_abnormal=flagged_abnormal,
+            source_dataset=source_dataset,
+            source_file=source_file,
+            context=context or {},
+        )
+
+    def _load_csv_rows_by_patient(self, filename: str) -> tuple[list[str], dict[str, list[list[str]]]]:
+        """
+        Header and raw rows of `filename` grouped by lowercased PATIENT, re-read only
+        when the file's (mtime_ns, size) changes.
 
-    def _load_csv_rows(self, filename: str) -> list[dict[str, str]]:
+        Rows stay as the C reader's lists; only the rows of a queried patient are
+        turned into dicts (see `_patient_csv_rows`).
+        """
         path = self.csv_dir / filename
-        if not path.exists():
-            return []
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._csv_cache.pop(filename, None)
+            return [], {}
+        fingerprint = (stat.st_mtime_ns, stat.st_size)
+        cached = self._csv_cache.get(filename)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1], cached[2]
+        header: list[str] = []
+        grouped: dict[str, list[list[str]]] = defaultdict(list)
         with path.open(newline="", encoding="utf-8") as handle:
-            return list(csv.DictReader(handle))
+            reader = csv.reader(handle)
+            header = next(reader, [])
+            patient_col = header.index("PATIENT") if "PATIENT" in header else None
+            for row in reader:
+                if not row:
+                    continue
+                key = row[patient_col].strip().lower() if patient_col is not None and patient_col < len(row) else ""
+                grouped[key].append(row)
+        self._csv_cache[filename] = (fingerprint, header, dict(grouped))
+        return header, self._csv_cache[filename][2]
+
+    def _patient_csv_rows(self, filename: str, pid: str) -> list[dict[str, str]]:
+        header, index = self._load_csv_rows_by_patient(filename)
+        return [dict(zip(header, row)) for row in index.get(pid, ())]
+
+    def _doc_listing(self) -> list[tuple[str, Path, list[str]]]:
+        """
+        (dtype, folder, sorted entry names) for each document folder, in doc_dirs order.
+        Re-listed only when one of the folders changes.
+        """
+        fingerprint = tuple(folder.stat().st_mtime_ns if folder.is_dir() else -1 for folder in self.doc_dirs.values())
+        if self._doc_listing_cache is not None and self._doc_listing_cache[0] == fingerprint:
+            return self._doc_listing_cache[1]
+        listing: list[tuple[str, Path, list[str]]] = []
+        for dtype, folder in self.doc_dirs.items():
+            try:
+                with os.scandir(folder) as entries:
+                    names = sorted(entry.name for entry in entries)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            listing.append((dtype, folder, names))
+        self._doc_listing_cache = (fingerprint, listing)
+        return listing
 
     def _doc_paths_for_patient(self, patient_uuid: str | None) -> list[tuple[str, Path]]:
+        # Same rule as the old glob("*<uuid>*"): the UUID may appear anywhere in the name.
         if not patient_uuid:
             return []
-        out: list[tuple[str, Path]] = []
-        for dtype, folder in self.doc_dirs.items():
-            for p in sorted(folder.glob(f"*{patient_uuid}*")):
-                out.append((dtype, p))
-        return out
+        return [
+            (dtype, folder / name)
+            for dtype, folder, names in self._doc_listing()
+            for name in names
+            if patient_uuid in name
+        ]
 
-    def _build_csv_events(self, patient_uuid: str | None) -> list[dict[str, Any]]:
+    @staticmethod
+    def _split_doc_paths(doc_paths: list[tuple[str, Path]]) -> tuple[list[Path], list[tuple[str, Path]]]:
+        """C-CDA paths and (dtype, path) FHIR pairs, split in one pass."""
+        ccda_paths: list[Path] = []
+        fhir_paths: list[tuple[str, Path]] = []
+        for item in doc_paths:
+            if item[0] == "ccda":
+                ccda_paths.append(item[1])
+            else:
+                fhir_paths.append(item)
+        return ccda_paths, fhir_paths
+
+    def _build_csv_events(self, patient_uuid: str | None) -> list[TemporalEvent]:
         if not patient_uuid:
             return []
         pid = patient_uuid.lower()
-        events: list[dict[str, Any]] = []
-
-        def _filter_rows(rows: list[dict[str, str]]) -> list[dict[str, str]]:
-            return [r for r in rows if _safe_str(r.get("PATIENT")).lower() == pid]
+        events: list[TemporalEvent] = []
+        append = events.append
+        new_event = self._new_event
 
-        encounters = _filter_rows(self._load_csv_rows("encounters.csv"))
+        encounters = self._patient_csv_rows("encounters.csv", pid)
         for row in encounters:
             start = _parse_any_datetime(row.get("START"))
             end = _parse_any_datetime(row.get("STOP"))
-            encounter_id = _safe_str(row.get("Id"))
-            desc = _safe_str(row.get("DESCRIPTION"))
-            reason = _safe_str(row.get("REASONDESCRIPTION"))
-            code = _safe_str(row.get("CODE")) or None
+            encounter_id = (row.get("Id") or "").strip()
+            desc = (row.get("DESCRIPTION") or "").strip()
+            reason = (row.get("REASONDESCRIPTION") or "").strip()
+            code = (row.get("CODE") or "").strip() or None
 
-            events.append(
-                self._new_event(
+            append(
+                new_event(
                     category="admission_discharge",
                     subtype="encounter_cycle",
                     source_dataset="csv",
@@ -172,17 +484,17 @@ class TemporalEvolutionAgent:
                     code=code,
                     context={
                         "encounter_id": encounter_id,
-                        "encounter_class": _safe_str(row.get("ENCOUNTERCLASS")) or None,
-                        "provider_id": _safe_str(row.get("PROVIDER")) or None,
-                        "organization_id": _safe_str(row.get("ORGANIZATION")) or None,
-                        "payer_id": _safe_str(row.get("PAYER")) or None,
+                        "encounter_class": (row.get("ENCOUNTERCLASS") or "").strip() or None,
+                        "provider_id": (row.get("PROVIDER") or "").strip() or None,
+                        "organization_id": (row.get("ORGANIZATION") or "").strip() or None,
+                        "payer_id": (row.get("PAYER") or "").strip() or None,
                         "reason": reason or None,
                     },
                 )
             )
             if start:
-                events.append(
-                    self._new_event(
+                append(
+                    new_event(
                         category="admission_discharge",
                         subtype="admission",
                         source_dataset="csv",
@@ -194,8 +506,8 @@ class TemporalEvolutionAgent:
                     )
                 )
             if end:
-                events.append(
-                    self._new_event(
+                append(
+                    new_event(
                         category="admission_discharge",
                         subtype="discharge",
                         source_dataset="csv",
@@ -207,17 +519,17 @@ class TemporalEvolutionAgent:
                     )
                 )
 
-        conditions = _filter_rows(self._load_csv_rows("conditions.csv"))
+        conditions = self._patient_csv_rows("conditions.csv", pid)
         for row in conditions:
             start = _parse_any_datetime(row.get("START"))
             stop = _parse_any_datetime(row.get("STOP"))
-            desc = _safe_str(row.get("DESCRIPTION")) or "Condition"
-            code = _safe_str(row.get("CODE")) or None
-            encounter_id = _safe_str(row.get("ENCOUNTER")) or None
+            desc = (row.get("DESCRIPTION") or "").strip() or "Condition"
+            code = (row.get("CODE") or "").strip() or None
+            encounter_id = (row.get("ENCOUNTER") or "").strip() or None
 
             if start:
-                events.append(
-                    self._new_event(
+                append(
+                    new_event(
                         category="diagnosis_onset",
                         subtype="diagnosis_start",
                         source_dataset="csv",
@@ -229,8 +541,8 @@ class TemporalEvolutionAgent:
                     )
                 )
             if stop:
-                events.append(
-                    self._new_event(
+                append(
+                    new_event(
                         category="diagnosis_onset",
                         subtype="diagnosis_resolved",
                         source_dataset="csv",
@@ -242,17 +554,17 @@ class TemporalEvolutionAgent:
                     )
                 )
 
-        medications = _filter_rows(self._load_csv_rows("medications.csv"))
-        med_by_name: dict[str, list[tuple[str, str | None]]] = defaultdict(list)
+        medications = self._patient_csv_rows("medications.csv", pid)
+        med_starts: dict[str, list[str]] = defaultdict(list)
         for row in medications:
             start = _parse_any_datetime(row.get("START"))
             stop = _parse_any_datetime(row.get("STOP"))
-            name = _safe_str(row.get("DESCRIPTION")) or "Medication"
-            reason = _safe_str(row.get("REASONDESCRIPTION")) or None
-            code = _safe_str(row.get("CODE")) or None
+            name = (row.get("DESCRIPTION") or "").strip() or "Medication"
+            reason = (row.get("REASONDESCRIPTION") or "").strip() or None
+            code = (row.get("CODE") or "").strip() or None
             if start:
-                events.append(
-                    self._new_event(
+                append(
+                    new_event(
                         category="treatment_change",
                         subtype="medication_start",
                         source_dataset="csv",
@@ -260,13 +572,13 @@ class TemporalEvolutionAgent:
                         time_start=start,
                         description=name,
                         code=code,
-                        context={"reason": reason, "encounter_id": _safe_str(row.get("ENCOUNTER")) or None},
+                        context={"reason": reason, "encounter_id": (row.get("ENCOUNTER") or "").strip() or None},
                     )
                 )
-                med_by_name[name].append((start, "start"))
+                med_starts[name].append(start)
             if stop:
-                events.append(
-                    self._new_event(
+                append(
+                    new_event(
                         category="treatment_change",
                         subtype="medication_stop",
                         source_dataset="csv",
@@ -274,35 +586,35 @@ class TemporalEvolutionAgent:
                         time_start=stop,
                         description=name,
                         code=code,
-                        context={"reason": reason, "encounter_id": _safe_str(row.get("ENCOUNTER")) or None},
+                        context={"reason": reason, "encounter_id": (row.get("ENCOUNTER") or "").strip() or None},
                     )
                 )
-                med_by_name[name].append((stop, "stop"))
+                # Keep the key order the old (time, kind) grouping had.
+                med_starts.setdefault(name, [])
 
-        for med_name, points in med_by_name.items():
-            starts = sorted([t for t, kind in points if kind == "start" and t])
+        for med_name, starts in med_starts.items():
             if len(starts) > 1:
-                events.append(
-                    self._new_event(
+                append(
+                    new_event(
                         category="treatment_change",
                         subtype="medication_restart_or_change",
                         source_dataset="csv",
                         source_file="data/csv/medications.csv",
-                        time_start=starts[-1],
+                        time_start=max(starts),
                         description=med_name,
                         context={"starts_observed": len(starts)},
                     )
                 )
 
-        observations = _filter_rows(self._load_csv_rows("observations.csv"))
+        observations = self._patient_csv_rows("observations.csv", pid)
         for row in observations:
             t = _parse_any_datetime(row.get("DATE"))
-            desc = _safe_str(row.get("DESCRIPTION")) or "Observation"
-            value = _safe_str(row.get("VALUE")) or None
-            unit = _safe_str(row.get("UNITS")) or None
-            code = _safe_str(row.get("CODE")) or None
-            events.append(
-                self._new_event(
+            desc = (row.get("DESCRIPTION") or "").strip() or "Observation"
+            value = (row.get("VALUE") or "").strip() or None
+            unit = (row.get("UNITS") or "").strip() or None
+            code = (row.get("CODE") or "").strip() or None
+            append(
+                new_event(
                     category="lab_trend",
                     subtype="observation",
                     source_dataset="csv",
@@ -312,116 +624,68 @@ class TemporalEvolutionAgent:
                     code=code,
                     value=value,
                     unit=unit,
-                    context={"encounter_id": _safe_str(row.get("ENCOUNTER")) or None, "type": _safe_str(row.get("TYPE")) or None},
+                    context={"encounter_id": (row.get("ENCOUNTER") or "").strip() or None, "type": (row.get("TYPE") or "").strip() or None},
                 )
             )
 
-        procedures = _filter_rows(self._load_csv_rows("procedures.csv"))
+        procedures = self._patient_csv_rows("procedures.csv", pid)
         for row in procedures:
             t = _parse_any_datetime(row.get("DATE"))
-            events.append(
-                self._new_event(
+            append(
+                new_event(
                     category="treatment_change",
                     subtype="procedure",
                     source_dataset="csv",
                     source_file="data/csv/procedures.csv",
                     time_start=t,
-                    description=_safe_str(row.get("DESCRIPTION")) or "Procedure",
-                    code=_safe_str(row.get("CODE")) or None,
-                    context={"reason": _safe_str(row.get("REASONDESCRIPTION")) or None},
+                    description=(row.get("DESCRIPTION") or "").strip() or "Procedure",
+                    code=(row.get("CODE") or "").strip() or None,
+                    context={"reason": (row.get("REASONDESCRIPTION") or "").strip() or None},
                 )
             )
 
-        careplans = _filter_rows(self._load_csv_rows("careplans.csv"))
+        careplans = self._patient_csv_rows("careplans.csv", pid)
         for row in careplans:
             start = _parse_any_datetime(row.get("START"))
             stop = _parse_any_datetime(row.get("STOP"))
-            events.append(
-                self._new_event(
+            append(
+                new_event(
                     category="treatment_change",
                     subtype="careplan_cycle",
                     source_dataset="csv",
                     source_file="data/csv/careplans.csv",
                     time_start=start,
                     time_end=stop,
-                    description=_safe_str(row.get("DESCRIPTION")) or "Care Plan",
-                    code=_safe_str(row.get("CODE")) or None,
+                    description=(row.get("DESCRIPTION") or "").strip() or "Care Plan",
+                    code=(row.get("CODE") or "").strip() or None,
                 )
             )
 
-        immunizations = _filter_rows(self._load_csv_rows("immunizations.csv"))
+        immunizations = self._patient_csv_rows("immunizations.csv", pid)
         for row in immunizations:
             t = _parse_any_datetime(row.get("DATE"))
-            events.append(
-                self._new_event(
+            append(
+                new_event(
                     category="treatment_change",
                     subtype="immunization",
                     source_dataset="csv",
                     source_file="data/csv/immunizations.csv",
                     time_start=t,
-                    description=_safe_str(row.get("DESCRIPTION")) or "Immunization",
-                    code=_safe_str(row.get("CODE")) or None,
+                    description=(row.get("DESCRIPTION") or "").strip() or "Immunization",
+                    code=(row.get("CODE") or "").strip() or None,
                 )
             )
 
         return events
 
-    def _build_ccda_events(self, ccda_paths: list[Path]) -> list[dict[str, Any]]:
-        events: list[dict[str, Any]] = []
-        target_time_tags = {"effectiveTime", "low", "high", "time"}
-        clinical_context_tags = {"encounter", "observation", "procedure", "substanceAdministration", "act", "organizer"}
-
+    def _build_ccda_events(self, ccda_paths: list[Path]) -> list[TemporalEvent]:
+        events: list[TemporalEvent] = []
+        append = events.append
+        new_event = self._new_event
         for path in ccda_paths:
-            try:
-                root = ET.parse(path).getroot()
-            except ET.ParseError:
-                continue
-
-            parent_map = {child: parent for parent in root.iter() for child in parent}
-
-            def local_tag(node: ET.Element) -> str:
-                return node.tag.split("}", 1)[-1]
-
-            def nearest_section_title(node: ET.Element) -> str | None:
-                cur = node
-                while cur in parent_map:
-                    cur = parent_map[cur]
-                    if local_tag(cur) == "section":
-                        title = cur.find("c:title", self.ccda_ns)
-                        if title is not None and title.text and title.text.strip():
-                            return title.text.strip()
-                        return None
-                return None
-
-            def nearest_clinical_context(node: ET.Element) -> ET.Element | None:
-                cur = node
-                while cur in parent_map:
-                    cur = parent_map[cur]
-                    if local_tag(cur) in clinical_context_tags:
-                        return cur
-                return None
-
-            for node in root.iter():
-                tag = local_tag(node)
-                if tag not in target_time_tags:
-                    continue
-                raw_time = node.attrib.get("value")
-                if not raw_time and node.text:
-                    raw_time = node.text
-                time_value = _parse_any_datetime(raw_time)
-                if not time_value:
-                    continue
-
-                ctx = nearest_clinical_context(node)
-                ctx_tag = local_tag(ctx) if ctx is not None else None
-                code = None
-                display = None
-                if ctx is not None:
-                    code_node = ctx.find("c:code", self.ccda_ns)
-                    if code_node is not None:
-                        code = _safe_str(code_node.attrib.get("code")) or None
-                        display = _safe_str(code_node.attrib.get("displayName")) or None
-
+            source_file = str(path)
+            points = _ccda_time_points(source_file, path.stat().st_mtime_ns)
+            for tag, raw_time, time_value, ctx_tag, code, display, section_title in points:
                 subtype = f"ccda_{tag}"
                 if tag == "low":
                     subtype = "ccda_period_start"
@@ -432,17 +696,17 @@ class TemporalEvolutionAgent:
                 elif tag == "effectiveTime":
                     subtype = "ccda_effective_time"
 
-                events.append(
-                    self._new_event(
+                append(
+                    new_event(
                         category="clinical_context_time",
                         subtype=subtype,
                         source_dataset="ccda",
-                        source_file=str(path),
+                        source_file=source_file,
                         time_start=time_value,
                         description=display or ctx_tag or "C-CDA time point",
                         code=code,
                         context={
-                            "section_title": nearest_section_title(node),
+                            "section_title": section_title,
                             "context_tag": ctx_tag,
                             "time_tag": tag,
                             "raw_time": raw_time,
@@ -451,44 +715,30 @@ class TemporalEvolutionAgent:
                 )
         return events
 
-    def _extract_fhir_times(self, resource: dict[str, Any]) -> list[tuple[str, str | None, str | None]]:
-        out: list[tuple[str, str | None, str | None]] = []
-        # Requested fields.
-        if resource.get("effectiveDateTime"):
-            out.append(("effectiveDateTime", _parse_any_datetime(resource.get("effectiveDateTime")), None))
-        if resource.get("issued"):
-            out.append(("issued", _parse_any_datetime(resource.get("issued")), None))
-        if resource.get("recordedDate"):
-            out.append(("recordedDate", _parse_any_datetime(resource.get("recordedDate")), None))
-        if resource.get("onsetDateTime"):
-            out.append(("onsetDateTime", _parse_any_datetime(resource.get("onsetDateTime")), None))
-        if isinstance(resource.get("onsetPeriod"), dict):
-            onset = resource["onsetPeriod"]
-            out.append(("onsetPeriod", _parse_any_datetime(onset.get("start")), _parse_any_datetime(onset.get("end"))))
-        if isinstance(resource.get("period"), dict):
-            period = resource["period"]
-            out.append(("period", _parse_any_datetime(period.get("start")), _parse_any_datetime(period.get("end"))))
-        return [x for x in out if x[1] or x[2]]
-
-    def _build_fhir_events(self, fhir_paths: list[tuple[str, Path]]) -> list[dict[str, Any]]:
-        events: list[dict[str, Any]] = []
+    def _build_fhir_events(self, fhir_paths: list[tuple[str, Path]]) -> list[TemporalEvent]:
+        events: list[TemporalEvent] = []
+        append = events.append
+        new_event = self._new_event
         abnormal_codes = {"H", "HH", "L", "LL", "A", "AA"}
 
         for dataset_type, path in fhir_paths:
             if path.suffix.lower() != ".json":
                 continue
             try:
-                bundle = json.loads(path.read_text(encoding="utf-8"))
+                bundle = _json_loads(path.read_bytes())
             except (json.JSONDecodeError, UnicodeDecodeError):
                 continue
+            source_file = str(path)
 
             for entry in bundle.get("entry", []):
-                resource = entry.get("resource") or {}
-                rtype = _safe_str(resource.get("resourceType")) or "Resource"
+                resource = entry.get("resource") or _EMPTY_DICT
+                # One shared string per resource type across bundles and events.
+                rtype = sys.intern(_safe_str(resource.get("resourceType")) or "Resource")
                 rid = _safe_str(resource.get("id")) or None
 
-                code_obj = resource.get("code") or {}
-                coding = (code_obj.get("coding") or [{}])[0]
+                code_obj = resource.get("code") or _EMPTY_DICT
+                codings = code_obj.get("coding")
+                coding = codings[0] if codings else _EMPTY_DICT
                 code = _safe_str(coding.get("code")) or None
                 display = (
                     _safe_str(code_obj.get("text"))
@@ -498,43 +748,29 @@ class TemporalEvolutionAgent:
                 )
 
                 # Core normalized times requested by the spec.
-                points = self._extract_fhir_times(resource)
+                points = _TIME_EXTRACTORS.get(rtype, _fhir_times)(resource)
 
                 # Some resources (Encounter) carry period in nested structures.
                 if rtype == "Encounter" and not points:
-                    period = resource.get("period") or {}
+                    period = resource.get("period") or _EMPTY_DICT
                     points = [("period", _parse_any_datetime(period.get("start")), _parse_any_datetime(period.get("end")))]
 
-                is_abnormal = False
-                if rtype == "Observation":
-                    for interp in resource.get("interpretation", []) or []:
-                        for c in interp.get("coding", []) or []:
-                            if _safe_str(c.get("code")).upper() in abnormal_codes:
-                                is_abnormal = True
-                                break
-
-                category = "clinical_context_time"
-                subtype = f"{rtype.lower()}_time"
-                if rtype == "Condition":
-                    category = "diagnosis_onset"
-                    subtype = "condition_event"
-                elif rtype in {"MedicationRequest", "MedicationStatement", "MedicationAdministration"}:
-                    category = "treatment_change"
-                    subtype = "medication_event"
-                elif rtype in {"Procedure", "CarePlan", "ServiceRequest"}:
-                    category = "treatment_change"
-                    subtype = f"{rtype.lower()}_event"
-                elif rtype == "Encounter":
-                    category = "admission_discharge"
-                    subtype = "encounter_cycle"
-                elif rtype == "Observation":
-                    category = "lab_trend"
-                    subtype = "observation"
+                is_abnormal = rtype == "Observation" and any(
+                    _safe_str(c.get("code")).upper() in abnormal_codes
+                    for interp in resource.get("interpretation") or ()
+                    for c in interp.get("coding") or ()
+                )
+
+                mapped = _FHIR_TYPE_MAP.get(rtype)
+                if mapped is not None:
+                    category, subtype = mapped
+                else:
+                    category, subtype = "clinical_context_time", f"{rtype.lower()}_time"
 
                 value = None
                 unit = None
                 if rtype == "Observation":
-                    q = resource.get("valueQuantity") or {}
+                    q = resource.get("valueQuantity") or _EMPTY_DICT
                     if q:
                         value = _safe_str(q.get("value")) or None
                         unit = _safe_str(q.get("unit")) or None
@@ -544,12 +780,13 @@ class TemporalEvolutionAgent:
                 for label, t_start, t_end in points:
                     if not t_start and not t_end:
                         continue
-                    events.append(
-                        self._new_event(
+                    append(
+                        new_event(
                             category=category,
-                            subtype=f"{subtype}:{label}",
+                            # Labels come from a fixed set, so the joined subtypes are few.
+                            subtype=sys.intern(f"{subtype}:{label}"),
                             source_dataset=dataset_type,
-                            source_file=str(path),
+                            source_file=source_file,
                             time_start=t_start or t_end,
                             time_end=t_end if t_start else None,
                             description=display,
@@ -562,16 +799,25 @@ class TemporalEvolutionAgent:
                     )
         return events
 
-    def _build_export_events(self, identifier: str) -> list[dict[str, Any]]:
+    def _export_payloads(self) -> tuple[Path, dict[str, dict[str, Any]]] | None:
         """
-        Optional enrichment from patients-export-*.csv when patient_id/MRN is used.
+        Latest patients-export-*.csv and its payloads keyed by patient_id and MRN.
+
+        Parsed once per export file version; the first row wins for a repeated key,
+        as the old scan stopped at the first match. A row whose patient_data is not
+        a JSON object is skipped on its own, so one bad row never fails the lookup
+        of another patient.
         """
-        events: list[dict[str, Any]] = []
         exports = sorted(self.data_root.glob("patients-export-*.csv"), key=lambda p: p.stat().st_mtime)
         if not exports:
-            return events
+            return None
         export_path = exports[-1]
+        mtime_ns = export_path.stat().st_mtime_ns
+        cached = self._export_cache
+        if cached is not None and cached[0] == export_path and cached[1] == mtime_ns:
+            return export_path, cached[2]
 
+        payloads: dict[str, dict[str, Any]] = {}
         with export_path.open(newline="", encoding="utf-8") as handle:
             reader = csv.DictReader(handle, delimiter=";")
             for row in reader:
@@ -579,115 +825,139 @@ class TemporalEvolutionAgent:
                 if not raw:
                     continue
                 try:
-                    payload = json.loads(raw)
-                except json.JSONDecodeError:
-                    continue
-                pid = _safe_str(payload.get("patient_id"))
-                mrn = _safe_str(payload.get("medical_record_number"))
-                if identifier not in {pid, mrn}:
+                    payload = _json_loads(raw)
+                except ValueError:
+                    # orjson is stricter than json (NaN, integers past 64 bits).
+                    try:
+                        payload = json.loads(raw)
+                    except ValueError:
+                        continue
+                if not isinstance(payload, dict):
                     continue
+                payloads.setdefault(_safe_str(payload.get("patient_id")), payload)
+                payloads.setdefault(_safe_str(payload.get("medical_record_number")), payload)
+        self._export_cache = (export_path, mtime_ns, payloads)
+        return export_path, payloads
 
-                for diag in payload.get("diagnoses", []) or []:
-                    t = _parse_any_datetime(diag.get("date_diagnosed"))
-                    if not t:
-                        continue
-                    events.append(
-                        self._new_event(
-                            category="diagnosis_onset",
-                            subtype="diagnosis_start",
-                            source_dataset="profile_export",
-                            source_file=str(export_path),
-                            time_start=t,
-                            description=_safe_str(diag.get("condition")) or "Diagnosis",
-                            code=_safe_str(diag.get("icd_code")) or None,
-                            context={"status": _safe_str(diag.get("status")) or None},
-                        )
-                    )
+    def _build_export_events(self, identifier: str) -> list[TemporalEvent]:
+        """
+        Optional enrichment from patients-export-*.csv when patient_id/MRN is used.
+        """
+        events: list[TemporalEvent] = []
+        export = self._export_payloads()
+        if export is None:
+            return events
+        export_path, payloads = export
+        payload = payloads.get(identifier)
+        if payload is None:
+            return events
+        source_file = str(export_path)
 
-                for med in payload.get("current_medications", []) or []:
-                    t = _parse_any_datetime(med.get("prescribed_at"))
-                    if not t:
-                        continue
-                    events.append(
-                        self._new_event(
-                            category="treatment_change",
-                            subtype="medication_start",
-                            source_dataset="profile_export",
-                            source_file=str(export_path),
-                            time_start=t,
-                            description=_safe_str(med.get("name")) or "Medication",
-                            context={"dosage": _safe_str(med.get("dosage")) or None},
-                        )
-                    )
+        for diag in payload.get("diagnoses", []) or []:
+            t = _parse_any_datetime(diag.get("date_diagnosed"))
+            if not t:
+                continue
+            events.append(
+                self._new_event(
+                    category="diagnosis_onset",
+                    subtype="diagnosis_start",
+                    source_dataset="profile_export",
+                    source_file=source_file,
+                    time_start=t,
+                    description=_safe_str(diag.get("condition")) or "Diagnosis",
+                    code=_safe_str(diag.get("icd_code")) or None,
+                    context={"status": _safe_str(diag.get("status")) or None},
+                )
+            )
 
-                for lab in payload.get("lab_results", []) or []:
-                    t = _parse_any_datetime(lab.get("date_performed"))
-                    if not t:
-                        continue
-                    events.append(
-                        self._new_event(
-                            category="lab_trend",
-                            subtype="observation",
-                            source_dataset="profile_export",
-                            source_file=str(export_path),
-                            time_start=t,
-                            description=_safe_str(lab.get("test_name")) or "Lab",
-                            value=_safe_str(lab.get("result")) or None,
-                            unit=_safe_str(lab.get("unit")) or None,
-                            flagged_abnormal=bool(lab.get("flagged")),
-                        )
-                    )
+        for med in payload.get("current_medications", []) or []:
+            t = _parse_any_datetime(med.get("prescribed_at"))
+            if not t:
+                continue
+            events.append(
+                self._new_event(
+                    category="treatment_change",
+                    subtype="medication_start",
+                    source_dataset="profile_export",
+                    source_file=source_file,
+                    time_start=t,
+                    description=_safe_str(med.get("name")) or "Medication",
+                    context={"dosage": _safe_str(med.get("dosage")) or None},
+                )
+            )
 
-                admission = _parse_any_datetime(payload.get("admission_date"))
-                if admission:
-                    events.append(
-                        self._new_event(
-                            category="admission_discharge",
-                            subtype="admission",
-                            source_dataset="profile_export",
-                            source_file=str(export_path),
-                            time_start=admission,
-                            description="Admission date",
-                        )
-                    )
-                break
+        for lab in payload.get("lab_results", []) or []:
+            t = _parse_any_datetime(lab.get("date_performed"))
+            if not t:
+                continue
+            events.append(
+                self._new_event(
+                    category="lab_trend",
+                    subtype="observation",
+                    source_dataset="profile_export",
+                    source_file=source_file,
+                    time_start=t,
+                    description=_safe_str(lab.get("test_name")) or "Lab",
+                    value=_safe_str(lab.get("result")) or None,
+                    unit=_safe_str(lab.get("unit")) or None,
+                    flagged_abnormal=bool(lab.get("flagged")),
+                )
+            )
+
+        admission = _parse_any_datetime(payload.get("admission_date"))
+        if admission:
+            events.append(
+                self._new_event(
+                    category="admission_discharge",
+                    subtype="admission",
+                    source_dataset="profile_export",
+                    source_file=source_file,
+                    time_start=admission,
+                    description="Admission date",
+                )
+            )
         return events
 
-    def _abnormal_lab_episodes(self, timeline: list[dict[str, Any]]) -> list[dict[str, Any]]:
-        lab_events = [e for e in timeline if e["category"] == "lab_trend" and e.get("time_start")]
-        groups: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    def _abnormal_lab_episodes(self, lab_events: list[TemporalEvent]) -> list[dict[str, Any]]:
+        """
+        Flag and trend episodes per test from the lab_trend bucket of the sorted timeline.
+
+        The bucket is already in (time_start, event_id) order, so each test group is too.
+        """
+        groups: dict[str, list[TemporalEvent]] = defaultdict(list)
         for e in lab_events:
-            key = (e.get("description") or "unknown").strip().lower()
+            key = (e.description or "unknown").strip().lower()
             groups[key].append(e)
 
         episodes: list[dict[str, Any]] = []
         for test, items in groups.items():
-            items.sort(key=lambda x: x.get("time_start") or "")
-            numeric = []
-            abnormal_points = []
+            abnormal_points = [it for it in items if it.flagged_abnormal]
+            # Only the first/last numeric points and their count feed the trend check.
+            points = 0
+            first_t = last_t = None
+            first_v = last_v = 0.0
             for it in items:
-                if it.get("flagged_abnormal"):
-                    abnormal_points.append(it)
-                try:
-                    numeric.append((it["time_start"], float(str(it.get("value")))))
-                except (TypeError, ValueError):
+                v = _to_float(it.value)
+                if v is None:
                     continue
+                if not points:
+                    first_t, first_v = it.time_start, v
+                last_t, last_v = it.time_start, v
+                points += 1
 
             if abnormal_points:
                 episodes.append(
                     {
                         "episode_type": "abnormal_lab_flag",
-                        "test_name": items[0].get("description"),
-                        "time_start": abnormal_points[0]["time_start"],
-                        "time_end": abnormal_points[-1]["time_start"],
-                        "event_ids": [x["event_id"] for x in abnormal_points],
+                        "test_name": items[0].description,
+                        "time_start": abnormal_points[0].time_start,
+                        "time_end": abnormal_points[-1].time_start,
+                        "event_ids": [x.event_id for x in abnormal_points],
                         "details": {"flags_count": len(abnormal_points)},
                     }
                 )
 
-            if len(numeric) >= 3:
-                first_t, first_v = numeric[0]
-                last_t, last_v = numeric[-1]
+            if points >= 3:
                 if first_v != 0:
                     change_ratio = (last_v - first_v) / abs(first_v)
                     if abs(change_ratio) >= 0.2:
@@ -695,60 +965,60 @@ class TemporalEvolutionAgent:
                         episodes.append(
                             {
                                 "episode_type": "abnormal_lab_trend",
-                                "test_name": items[0].get("description"),
+                                "test_name": items[0].description,
                                 "time_start": first_t,
                                 "time_end": last_t,
-                                "event_ids": [x["event_id"] for x in items],
+                                "event_ids": [x.event_id for x in items],
                                 "details": {
                                     "trend": trend,
                                     "relative_change": round(change_ratio, 3),
-                                    "points": len(numeric),
+                                    "points": points,
                                 },
                             }
                         )
         return episodes
 
-    def _build_episodes(self, timeline: list[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
+    def _build_episodes(self, by_category: dict[str, list[TemporalEvent]]) -> dict[str, list[dict[str, Any]]]:
+        """Episodes from the sorted timeline, already bucketed by event category."""
         diagnosis_onset = [
             {
                 "episode_type": "diagnosis_onset",
-                "time_start": e.get("time_start"),
-                "description": e.get("description"),
-                "code": e.get("code"),
-                "event_ids": [e.get("event_id")],
+                "time_start": e.time_start,
+                "description": e.description,
+                "code": e.code,
+                "event_ids": [e.event_id],
             }
-            for e in timeline
-            if e["category"] == "diagnosis_onset" and "start" in (e.get("subtype") or "")
+            for e in by_category.get("diagnosis_onset", ())
+            if "start" in (e.subtype or "")
         ]
 
         treatment_change = [
             {
                 "episode_type": "treatment_change",
-                "time_start": e.get("time_start"),
-                "time_end": e.get("time_end"),
-                "description": e.get("description"),
-                "subtype": e.get("subtype"),
-                "event_ids": [e.get("event_id")],
+                "time_start": e.time_start,
+                "time_end": e.time_end,
+                "description": e.description,
+                "subtype": e.subtype,
+                "event_ids": [e.event_id],
             }
-            for e in timeline
-            if e["category"] == "treatment_change"
-            and any(k in (e.get("subtype") or "") for k in ["start", "stop", "change", "restart", "procedure", "careplan"])
+            for e in by_category.get("treatment_change", ())
+            if _TC_RE(e.subtype or "")
         ]
 
         admission_discharge_cycles = [
             {
                 "episode_type": "admission_discharge_cycle",
-                "time_start": e.get("time_start"),
-                "time_end": e.get("time_end"),
-                "description": e.get("description"),
-                "source_dataset": e.get("source_dataset"),
-                "event_ids": [e.get("event_id")],
+                "time_start": e.time_start,
+                "time_end": e.time_end,
+                "description": e.description,
+                "source_dataset": e.source_dataset,
+                "event_ids": [e.event_id],
             }
-            for e in timeline
-            if e["category"] == "admission_discharge" and "cycle" in (e.get("subtype") or "")
+            for e in by_category.get("admission_discharge", ())
+            if "cycle" in (e.subtype or "")
         ]
 
-        abnormal_lab_trend = self._abnormal_lab_episodes(timeline)
+        abnormal_lab_trend = self._abnormal_lab_episodes(by_category.get("lab_trend", []))
 
         return {
             "diagnosis_onset": diagnosis_onset,
@@ -757,43 +1027,95 @@ class TemporalEvolutionAgent:
             "admission_discharge_cycles": admission_discharge_cycles,
         }
 
+    @staticmethod
+    def _order_timeline(events: Iterable[TemporalEvent]) -> list[TemporalEvent]:
+        timeline = [e for e in events if e.time_start]
+        timeline.sort(key=_timeline_key)
+        return timeline
+
+    def _uuid_timeline(self, patient_uuid: str) -> list[dict[str, Any]]:
+        """CSV, C-CDA and FHIR timeline for one CSV patient UUID, numbered from ev_000001."""
+        self._event_idx = 0
+        ccda_paths, fhir_paths = self._split_doc_paths(self._doc_paths_for_patient(patient_uuid))
+        csv_events = self._build_csv_events(patient_uuid)
+        ccda_events = self._build_ccda_events(ccda_paths)
+        fhir_events = self._build_fhir_events(fhir_paths)
+        return [e.to_dict() for e in self._order_timeline(chain(csv_events, ccda_events, fhir_events))]
+
+    def build_timelines(self, patient_uuids: list[str], max_workers: int | None = None) -> dict[str, list[dict[str, Any]]]:
+        """
+        Timelines for a cohort of CSV patient UUIDs, built across worker processes.
+
+        Each worker gets only the data root and builds its own agent, so the CSV
+        indexes and document listing are loaded once per worker rather than pickled
+        from this one.
+
+        Unlike `build()`, each timeline holds only the CSV, C-CDA and FHIR events:
+        no profile-export events, no episodes, no identity or source counts.
+        Event ids restart at ev_000001 for every patient.
+        """
+        if not patient_uuids:
+            return {}
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_timeline_worker, initargs=(str(self.data_root),)
+        ) as pool:
+            timelines = pool.map(_worker_uuid_timeline, patient_uuids, chunksize=max(1, len(patient_uuids) // 64))
+            return dict(zip(patient_uuids, timelines))
+
     def build(self, identifier: str) -> dict[str, Any]:
         resolved = self.identity_agent.resolve_one(identifier)
         patient_uuid = resolved.csv_patient_uuid if resolved else None
+        self._event_idx = 0
 
+        ccda_paths, fhir_paths = self._split_doc_paths(self._doc_paths_for_patient(patient_uuid))
         csv_events = self._build_csv_events(patient_uuid)
-        doc_paths = self._doc_paths_for_patient(patient_uuid)
-        ccda_paths = [p for dtype, p in doc_paths if dtype == "ccda"]
-        fhir_paths = [(dtype, p) for dtype, p in doc_paths if dtype != "ccda"]
         ccda_events = self._build_ccda_events(ccda_paths)
         fhir_events = self._build_fhir_events(fhir_paths)
         export_events = self._build_export_events(identifier)
 
-        timeline = csv_events + ccda_events + fhir_events + export_events
-        timeline = [e for e in timeline if e.get("time_start")]
-        timeline.sort(key=lambda e: (e.get("time_start") or "", e.get("event_id") or ""))
+        # Walk the per-source lists in place rather than concatenating them.
+        timeline = self._order_timeline(chain(csv_events, ccda_events, fhir_events, export_events))
 
-        episodes = self._build_episodes(timeline)
+        by_category: dict[str, list[TemporalEvent]] = defaultdict(list)
+        for e in timeline:
+            by_category[e.category].append(e)
+        episodes = self._build_episodes(by_category)
+
+        source_counts = {
+            "csv_events": len(csv_events),
+            "ccda_events": len(ccda_events),
+            "fhir_events": len(fhir_events),
+            "profile_export_events": len(export_events),
+            "timeline_total": len(timeline),
+        }
+        for group, count_key in _EPISODE_COUNT_KEYS:
+            source_counts[count_key] = len(episodes[group])
 
         return {
             "identity": resolved.to_dict() if resolved else None,
-            "timeline": timeline,
+            "timeline": [e.to_dict() for e in timeline],
             "episodes": episodes,
-            "source_counts": {
-                "csv_events": len(csv_events),
-                "ccda_events": len(ccda_events),
-                "fhir_events": len(fhir_events),
-                "profile_export_events": len(export_events),
-                "timeline_total": len(timeline),
-                "diagnosis_onset_episodes": len(episodes["diagnosis_onset"]),
-                "treatment_change_episodes": len(episodes["treatment_change"]),
-                "abnormal_lab_trend_episodes": len(episodes["abnormal_lab_trend"]),
-                "admission_discharge_cycle_episodes": len(episodes["admission_discharge_cycles"]),
-            },
+            "source_counts": source_counts,
         }
 
 
+_worker_agent: TemporalEvolutionAgent | None = None
+
+
+def _init_timeline_worker(data_root: str) -> None:
+    global _worker_agent
+    _worker_agent = TemporalEvolutionAgent(data_root)
+
+
+def _worker_uuid_timeline(patient_uuid: str) -> list[dict[str, Any]]:
+    if _worker_agent is None:
+        raise RuntimeError("timeline worker used without _init_timeline_worker")
+    return _worker_agent._uuid_timeline(patient_uuid)
+
+
 def main() -> None:
+    import argparse
+
     parser = argparse.ArgumentParser(description="Build chronological clinical evolution across CSV, C-CDA and FHIR.")
     parser.add_argument("--identifier", required=True, help="Patient UUID, patient_id, or medical_record_number.")
     parser.add_argument("--data-root", default="data", help="Path to data directory.")
@@ -802,12 +1124,15 @@ def main() -> None:
 
     agent = TemporalEvolutionAgent(args.data_root)
     evolution = agent.build(args.identifier)
-    print(json.dumps(evolution, indent=2))
+    encoded = encode_payload(evolution)
+    sys.stdout.buffer.write(encoded)
+    sys.stdout.buffer.write(b"\n")
+    sys.stdout.buffer.flush()
 
     if args.output:
         out = Path(args.output)
         out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_text(json.dumps(evolution, indent=2), encoding="utf-8")
+        out.write_bytes(encoded)
 
 
 if __name__ == "__main__":
@@ -5,7 +5,7 @@ from typing import Optional
 from .medical import VitalSigns
 
 
-@dataclass
+@dataclass(slots=True)
 class ClinicalNote:
     """Clinical consultation note"""
     note_type: str  # e.g., "GP Consultation", "Orthopedic", "Cardiology"
@@ -25,7 +25,7 @@ class ClinicalNote:
     follow_up_instructions: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ImagingStudy:
     """Imaging study result"""
     study_type: str  # e.g., "MRI Lumbar Spine"
@@ -36,7 +36,7 @@ class ImagingStudy:
     radiologist: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DiagnosticTest:
     """Diagnostic test (e.g., ECG, Stress Test)"""
     test_type: str
@@ -46,7 +46,7 @@ class DiagnosticTest:
     ordered_by: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Diagnosis:
     """Medical diagnosis"""
     condition: str
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ContactInfo:
     """Contact information for patient"""
     phone: str
@@ -12,7 +12,7 @@ class ContactInfo:
     emergency_contact_phone: Optional[str] = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Insurance:
     """Insurance information"""
     provider: str
@@ -1,13 +1,13 @@
 from enum import Enum
 
 
-class Gender(Enum):
+class Gender(str, Enum):
     MALE = "male"
     FEMALE = "female"
     OTHER = "other"
 
 
-class AllergyStatus(Enum):
+class AllergyStatus(str, Enum):
     CONFIRMED = "confirmed"
     SUSPECTED = "suspected"
     DENIED = "denied"
@@ -5,7 +5,7 @@ from typing import Any, Optional
 from .patient import Patient
 
 
-@dataclass
+@dataclass(slots=True)
 class TimelineEvent:
     """Normalized time-ordered clinical event."""
 
@@ -25,7 +25,7 @@ class TimelineEvent:
     provenance: dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class ClinicalEpisode:
     """Grouped clinical episode derived from one or more timeline events."""
 
@@ -40,7 +40,7 @@ class ClinicalEpisode:
     details: dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class EvolutionAlert:
     """Actionable signal detected from temporal evolution."""
 
@@ -55,7 +55,7 @@ class EvolutionAlert:
     metadata: dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class PatientEvolution:
     """Temporal view of a patient: profile + timeline + episodes + alerts."""
 
@@ -3,7 +3,7 @@ from datetime import date
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class LabResult:
     """Laboratory test result"""
     test_name: str
@@ -14,7 +14,7 @@ class LabResult:
     date_performed: Optional[date] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CompleteBloodCount(LabResult):
     """Specialized CBC lab result"""
     wbc: Optional[float] = None
@@ -24,7 +24,7 @@ class CompleteBloodCount(LabResult):
     platelets: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class LipidPanel(LabResult):
     """Specialized lipid panel result"""
     total_cholesterol: Optional[int] = None
@@ -33,7 +33,7 @@ class LipidPanel(LabResult):
     triglycerides: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ChemistryPanel(LabResult):
     """Chemistry panel result"""
     sodium: Optional[float] = None
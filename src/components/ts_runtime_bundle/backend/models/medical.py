@@ -5,7 +5,7 @@ from typing import Optional
 from .enums import AllergyStatus
 
 
-@dataclass
+@dataclass(slots=True)
 class Allergy:
     """Patient allergy information"""
     allergen: str
@@ -14,7 +14,7 @@ class Allergy:
     recorded_at: Optional[datetime] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Medication:
     """Current medication"""
     name: str
@@ -24,7 +24,7 @@ class Medication:
     prescribed_at: Optional[datetime] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class VitalSigns:
     """Vital signs measurement"""
     blood_pressure_systolic: Optional[int] = None
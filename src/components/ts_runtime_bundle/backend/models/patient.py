@@ -9,7 +9,7 @@ from .clinical import ClinicalNote, ImagingStudy, DiagnosticTest, Diagnosis
 from .labs import LabResult
 
 
-@dataclass
+@dataclass(slots=True)
 class Patient:
     """Complete patient medical record"""
     # Demographics